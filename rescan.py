@@ -1,43 +1,47 @@
 import os
+import stat
+import pickle
 import requests
-import configparser
+from requests.adapters import HTTPAdapter
 import xml.etree.ElementTree as ET
-from urllib.parse import quote
 import time
+import threading
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from plexapi.server import PlexServer
 import logging
-import json
 from datetime import datetime
-import schedule
-import discord
-from discord import Webhook, Embed, Color
 import asyncio
 import aiohttp
-from pydantic import BaseModel, HttpUrl, Field
+from pydantic import BaseModel, ConfigDict, HttpUrl, Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from typing import List
 import yaml
 
 # --- Pydantic Models for Settings ---
 
-class PlexSettings(BaseModel):
+class FrozenModel(BaseModel):
+    """Base for settings sections; settings are read-only once loaded."""
+    model_config = ConfigDict(frozen=True)
+
+class PlexSettings(FrozenModel):
     server: HttpUrl = Field(..., description="URL for the Plex server.")
     token: str = Field(..., description="Plex authentication token.")
 
-class LogsSettings(BaseModel):
+class LogsSettings(FrozenModel):
     loglevel: str = Field("INFO", description="Logging level (DEBUG, INFO, WARNING, ERROR, CRITICAL).")
 
-class BehaviourSettings(BaseModel):
-    scan_interval: int = Field(5, description="Seconds to wait between Plex library rescans.")
+class BehaviourSettings(FrozenModel):
+    scan_interval: int = Field(5, description="Seconds to wait between Plex library rescans (up to 4 run at once).")
     run_interval: int = Field(24, description="Hours to wait between full scans.")
     symlink_check: bool = Field(True, description="Enable to check for and skip broken symlinks.")
 
-class NotificationsSettings(BaseModel):
+class NotificationsSettings(FrozenModel):
     enabled: bool = Field(True, description="Enable/disable Discord notifications.")
     discord_webhook_url: HttpUrl | None = Field(None, description="Discord webhook URL for notifications.")
 
-class ScanSettings(BaseModel):
+class ScanSettings(FrozenModel):
     directories: List[str] = Field(..., description="List of directories to scan for media.")
 
 class Settings(BaseSettings):
@@ -48,7 +52,8 @@ class Settings(BaseSettings):
         json_file_path_dir="/app/config",
         json_file="config.json",
         json_file_encoding='utf-8',
-        validate_default=True
+        validate_default=True,
+        frozen=True
     )
 
     plex: PlexSettings
@@ -63,19 +68,49 @@ class Settings(BaseSettings):
 plex: PlexServer | None = None
 settings: Settings | None = None
 
+# Shared HTTP session, created on first use inside the running event loop
+_session: aiohttp.ClientSession | None = None
+
 # Constants
 DISCORD_AVATAR_URL = "https://raw.githubusercontent.com/pukabyte/rescan/master/assets/logo.png"
 DISCORD_WEBHOOK_NAME = "Rescan"
+DISCORD_EMBED_CHAR_LIMIT = 6000
+DISCORD_EMBED_FIELD_LIMIT = 25
+DISCORD_MESSAGE_EMBED_LIMIT = 10
+PLEX_PAGE_SIZE = 1000
+PLEX_PAGE_WORKERS = 8
+PLEX_REFRESH_CONCURRENCY = 4
+LIBRARY_CACHE_FILENAME = "library_cache.pkl"
 MEDIA_EXTENSIONS = {
     '.mp4', '.mkv', '.avi', '.mov', '.wmv', '.flv', '.webm',
     '.m4v', '.m4p', '.m4b', '.m4r', '.3gp', '.mpg', '.mpeg',
     '.m2v', '.m2ts', '.ts', '.vob', '.iso'
 }
+# Extensions without the leading dot, matched against the text after a name's last dot.
+# A single set lookup beats str.endswith() over a tuple and an anchored regex, which
+# were both measured slower.
+MEDIA_EXT_NAMES = frozenset(extension[1:] for extension in MEDIA_EXTENSIONS)
+
+# Keep-alive session for the library page requests. At most PLEX_PAGE_WORKERS
+# requests are open at once across all libraries warming up together, so the
+# pool keeps every connection for reuse.
+_http = requests.Session()
+_http_adapter = HTTPAdapter(pool_connections=1, pool_maxsize=PLEX_PAGE_WORKERS)
+_http.mount('http://', _http_adapter)
+_http.mount('https://', _http_adapter)
+_page_slots = threading.BoundedSemaphore(PLEX_PAGE_WORKERS)
 
 # In-memory caches
 library_ids = {}
 library_paths = {}
-library_files = defaultdict(set)
+# Files known to Plex per library section, as folder -> file names so that the
+# folder prefix is stored once for all files in it
+library_files: defaultdict[str, dict[str, set[str]]] = defaultdict(dict)
+# (normalized location, section id, section title), longest location first
+_section_index: list[tuple[str, str, str]] = []
+# Library files persisted between runs: section id -> {'version': ..., 'files': ...}
+_library_cache: dict[str, dict] = {}
+_library_cache_dirty = False
 
 # ANSI escape codes for text formatting
 BOLD = '\033[1m'
@@ -107,8 +142,8 @@ class RunStats:
     def add_warning(self, warning):
         self.warnings.append(warning)
 
-    def increment_scanned(self):
-        self.total_scanned += 1
+    def increment_scanned(self, count=1):
+        self.total_scanned += count
 
     def increment_broken_symlinks(self):
         self.broken_symlinks += 1
@@ -116,161 +151,159 @@ class RunStats:
     def get_run_time(self) -> str:
         return str(datetime.now() - self.start_time)
 
-    async def send_discord_summary(self):
+    async def send_discord_summary(self, session: aiohttp.ClientSession):
         if not settings.notifications.enabled:
-            logger.info("📢 Notifications are disabled in config.ini")
+            logger.info("📢 Notifications are disabled in the configuration")
             return
             
         if not settings.notifications.discord_webhook_url:
             logger.warning("Discord webhook URL not configured. Skipping notification.")
             return
 
+        # discord.py is slow to import and only needed when a webhook is configured
+        import discord
+        from discord import Webhook, Embed, Color
+
         try:
-            # Create webhook client with aiohttp session
-            async with aiohttp.ClientSession() as session:
-                webhook = Webhook.from_url(str(settings.notifications.discord_webhook_url), session=session)
-
-                # Create embed
-                embed = Embed(
-                    title="Rescan Summary",
-                    color=Color.blue(),
-                    timestamp=datetime.now()
-                )
+            # Create webhook client on the shared aiohttp session
+            webhook = Webhook.from_url(str(settings.notifications.discord_webhook_url), session=session)
+
+            # Create embed
+            embed = Embed(
+                title="Rescan Summary",
+                color=Color.blue(),
+                timestamp=datetime.now()
+            )
+
+            # Add overview
+            embed.add_field(
+                name="📊 Overview",
+                value=f"Found **{self.total_missing}** items from **{self.total_scanned}** scanned files",
+                inline=False
+            )
 
-                # Add overview
+            # Add broken symlinks summary if any
+            if self.broken_symlinks > 0:
                 embed.add_field(
-                    name="📊 Overview",
-                    value=f"Found **{self.total_missing}** items from **{self.total_scanned}** scanned files",
+                    name="⚠️ Issues",
+                    value=f"Broken Symlinks Skipped: **{self.broken_symlinks}**",
                     inline=False
                 )
 
-                # Add broken symlinks summary if any
-                if self.broken_symlinks > 0:
-                    embed.add_field(
-                        name="⚠️ Issues",
-                        value=f"Broken Symlinks Skipped: **{self.broken_symlinks}**",
-                        inline=False
-                    )
+            # Add library-specific stats
+            for library, items in self.missing_items.items():
+                embed.add_field(
+                    name=f"📁 {library}",
+                    value=f"Found: **{len(items)}** items",
+                    inline=True
+                )
 
-                # Add library-specific stats
-                for library, items in self.missing_items.items():
+            # Add other errors and warnings if any
+            if self.errors or self.warnings:
+                error_text = "\n".join([f"❌ {e}" for e in self.errors])
+                warning_text = "\n".join([f"⚠️ {w}" for w in self.warnings])
+                if error_text or warning_text:
                     embed.add_field(
-                        name=f"📁 {library}",
-                        value=f"Found: **{len(items)}** items",
-                        inline=True
+                        name="⚠️ Other Issues",
+                        value=f"{error_text}\n{warning_text}",
+                        inline=False
                     )
 
-                # Add other errors and warnings if any
-                if self.errors or self.warnings:
-                    error_text = "\n".join([f"❌ {e}" for e in self.errors])
-                    warning_text = "\n".join([f"⚠️ {w}" for w in self.warnings])
-                    if error_text or warning_text:
-                        embed.add_field(
-                            name="⚠️ Other Issues",
-                            value=f"{error_text}\n{warning_text}",
-                            inline=False
-                        )
-
-                # Add footer
-                embed.set_footer(text=f"Run Time: {self.get_run_time()}")
+            # Add footer
+            embed.set_footer(text=f"Run Time: {self.get_run_time()}")
 
-                # Send webhook
-                await send_discord_webhook(webhook, embed)
-                logger.info("✅ Discord notification sent successfully")
+            # Send webhook
+            await send_discord_webhook(webhook, embed)
+            logger.info("✅ Discord notification sent successfully")
 
         except discord.HTTPException as e:
             logger.error(f"Discord API error: {str(e)}")
         except Exception as e:
             logger.error(f"Failed to send Discord notification: {str(e)}")
 
-async def send_discord_webhook(webhook, embed):
-    """Send a Discord webhook message."""
-    try:
-        # Check if embed exceeds Discord's limits
-        if len(str(embed)) > 6000:
-            # Split into multiple embeds
-            base_embed = Embed(
-                title=embed.title,
-                color=embed.color,
-                timestamp=embed.timestamp
-            )
-            
-            # Add overview field
-            if embed.fields and embed.fields[0].name == "📊 Overview":
-                base_embed.add_field(
-                    name=embed.fields[0].name,
-                    value=embed.fields[0].value,
-                    inline=False
-                )
-            
-            # Send base embed
-            await webhook.send(
-                embed=base_embed,
-                avatar_url=DISCORD_AVATAR_URL,
-                username=DISCORD_WEBHOOK_NAME,
-                wait=True
-            )
-            
-            # Create additional embeds for libraries
-            current_embed = Embed(
-                title="📁 Library Details",
-                color=embed.color,
-                timestamp=embed.timestamp
+def split_embed(embed) -> list:
+    """Split an embed that exceeds Discord's limits into overview, library and issue embeds."""
+    from discord import Embed, Color
+
+    if len(embed) <= DISCORD_EMBED_CHAR_LIMIT and len(embed.fields) <= DISCORD_EMBED_FIELD_LIMIT:
+        return [embed]
+
+    base_embed = Embed(
+        title=embed.title,
+        color=embed.color,
+        timestamp=embed.timestamp
+    )
+    if embed.footer.text:
+        base_embed.set_footer(text=embed.footer.text)
+
+    issues_embed = Embed(
+        title="⚠️ Issues",
+        color=Color.red(),
+        timestamp=embed.timestamp
+    )
+
+    # Library fields are spread over as many embeds as needed, keeping a running
+    # character count instead of re-serializing the embed
+    library_embeds = []
+    current_embed, current_size = None, 0
+    for field in embed.fields:
+        if field.name == "📊 Overview":
+            base_embed.add_field(
+                name=field.name,
+                value=field.value,
+                inline=False
             )
-            
-            # Add library fields
-            for field in embed.fields[1:]:
-                if field.name.startswith("📁"):
-                    if len(str(current_embed)) + len(str(field)) > 6000:
-                        # Send current embed and create new one
-                        await webhook.send(
-                            embed=current_embed,
-                            avatar_url=DISCORD_AVATAR_URL,
-                            username=DISCORD_WEBHOOK_NAME,
-                            wait=True
-                        )
-                        current_embed = Embed(
-                            title="📁 Library Details (continued)",
-                            color=embed.color,
-                            timestamp=embed.timestamp
-                        )
-                    current_embed.add_field(
-                        name=field.name,
-                        value=field.value,
-                        inline=field.inline
-                    )
-            
-            # Send final library embed if it has fields
-            if current_embed.fields:
-                await webhook.send(
-                    embed=current_embed,
-                    avatar_url=DISCORD_AVATAR_URL,
-                    username=DISCORD_WEBHOOK_NAME,
-                    wait=True
-                )
-            
-            # Send issues in separate embed if they exist
-            if embed.fields and embed.fields[-1].name == "⚠️ Issues":
-                issues_embed = Embed(
-                    title="⚠️ Issues",
-                    color=Color.red(),
+        elif field.name.startswith("📁"):
+            field_size = len(field.name) + len(field.value)
+            if (current_embed is None
+                    or current_size + field_size > DISCORD_EMBED_CHAR_LIMIT
+                    or len(current_embed.fields) >= DISCORD_EMBED_FIELD_LIMIT):
+                current_embed = Embed(
+                    title="📁 Library Details (continued)" if library_embeds else "📁 Library Details",
+                    color=embed.color,
                     timestamp=embed.timestamp
                 )
-                issues_embed.add_field(
-                    name=embed.fields[-1].name,
-                    value=embed.fields[-1].value,
-                    inline=False
-                )
-                await webhook.send(
-                    embed=issues_embed,
-                    avatar_url=DISCORD_AVATAR_URL,
-                    username=DISCORD_WEBHOOK_NAME,
-                    wait=True
-                )
+                library_embeds.append(current_embed)
+                current_size = len(current_embed.title)
+            current_embed.add_field(
+                name=field.name,
+                value=field.value,
+                inline=field.inline
+            )
+            current_size += field_size
         else:
-            # Send single embed if within limits
+            issues_embed.add_field(
+                name=field.name,
+                value=field.value,
+                inline=False
+            )
+
+    return [base_embed, *library_embeds] + ([issues_embed] if issues_embed.fields else [])
+
+async def send_discord_webhook(webhook, embed):
+    """Send a Discord webhook message."""
+    import discord
+
+    try:
+        # Pack the embeds into as few messages as possible; Discord allows up to 10 embeds
+        # per message with at most 6000 characters across all of them
+        messages, current, current_size = [], [], 0
+        for part in split_embed(embed):
+            part_size = len(part)
+            if current and (len(current) >= DISCORD_MESSAGE_EMBED_LIMIT
+                            or current_size + part_size > DISCORD_EMBED_CHAR_LIMIT):
+                messages.append(current)
+                current, current_size = [], 0
+            current.append(part)
+            current_size += part_size
+        messages.append(current)
+
+        for index, embeds in enumerate(messages):
+            if index:
+                # Stay well under the webhook rate limit of 5 requests per second
+                await asyncio.sleep(0.25)
             await webhook.send(
-                embed=embed,
+                embeds=embeds,
                 avatar_url=DISCORD_AVATAR_URL,
                 username=DISCORD_WEBHOOK_NAME,
                 wait=True
@@ -282,144 +315,362 @@ async def send_discord_webhook(webhook, embed):
         logger.error(f"Failed to send webhook: {str(e)}")
         raise
 
+async def get_session() -> aiohttp.ClientSession:
+    """Return the shared aiohttp session, creating it on first use."""
+    global _session
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=32, keepalive_timeout=75),
+            # Keep a stuck request from hanging the scan loop
+            timeout=aiohttp.ClientTimeout(total=15)
+        )
+    return _session
+
+async def close_session():
+    """Close the shared aiohttp session if it was opened."""
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+
 def get_library_ids():
     """Fetch library section IDs and paths dynamically from Plex."""
-    global library_ids, library_paths
+    global library_ids, library_paths, _section_index, _library_cache_dirty
+    # Rebuilt from scratch on every run so removed or moved sections don't linger
+    ids, paths, section_index, section_ids = {}, {}, [], set()
     for section in plex.library.sections():
         lib_type = section.type
         lib_key = section.key
         lib_title = section.title
-        library_ids[lib_type] = lib_key
+        ids[lib_type] = lib_key
+        section_ids.add(str(lib_key))
         
         for location in section.locations:
-            library_paths[location] = lib_key
-            logger.debug(f"Found library '{lib_title}' (ID: {lib_key}) at path: {location}")
+            paths[location] = lib_key
+            # Normalized once here, with a trailing separator so '/mnt/tv' won't match '/mnt/tv-archive'
+            section_index.append((os.path.join(os.path.normpath(location), ''), str(lib_key), lib_title))
+            logger.debug("Found library '%s' (ID: %s) at path: %s", lib_title, lib_key, location)
+
+    # Longest locations first so the first prefix hit is the most specific match
+    section_index.sort(key=lambda item: len(item[0]), reverse=True)
+    library_ids, library_paths, _section_index = ids, paths, section_index
+
+    # Forget the persisted files of sections that were removed from Plex
+    for library_id in _library_cache.keys() - section_ids:
+        del _library_cache[library_id]
+        _library_cache_dirty = True
 
     return library_ids
 
-def get_library_id_for_path(file_path: str) -> tuple[str | None, str | None]:
-    """Get the library section ID for a given file path."""
-    url = f"{str(settings.plex.server).rstrip('/')}/library/sections"
-    params = {'X-Plex-Token': settings.plex.token}
-    
-    try:
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        root = ET.fromstring(response.content)
-    except requests.RequestException as e:
-        logger.error(f"Failed to get library sections from Plex: {e}")
-        return None, None
-
-    # Find matching sections
-    matching_sections = []
-    for section in root.findall('Directory'):
-        section_type = section.get('type')
-        section_id = section.get('key')
-        section_title = section.get('title')
-        
-        # Get all locations for this section
-        for location in section.findall('Location'):
-            location_path = location.get('path')
-            matching_sections.append((section_id, section_type, location_path, section_title))
-    
-    # Find best matching section (prefer more specific matches)
-    best_match = None
-    best_match_length = 0
-    
-    for section_id, section_type, location_path, section_title in matching_sections:
-        # Normalize paths for comparison
-        normalized_scan_path = os.path.normpath(file_path)
-        normalized_location = os.path.normpath(location_path)
-        
-        # Check if the file path starts with the library location
-        if normalized_scan_path.startswith(normalized_location):
-            # Use the longest matching path (most specific)
-            if len(normalized_location) > best_match_length:
-                best_match = (section_id, section_title)
-                best_match_length = len(normalized_location)
-    
-    if best_match:
-        section_id, section_title = best_match
-        logger.debug(f"Found best match in section: {section_title} (id: {section_id})")
-        return section_id, section_title
+def get_library_id_for_path(path: str) -> tuple[str | None, str | None]:
+    """Get the library section ID for a given (normalized) file or folder path."""
+    path_with_sep = path + os.sep
+    for location, section_id, section_title in _section_index:
+        if path_with_sep.startswith(location):
+            logger.debug("Found best match in section: %s (id: %s)", section_title, section_id)
+            return section_id, section_title
     
-    logger.warning(f"No matching library found for path: {file_path}")
+    logger.warning(f"No matching library found for path: {path}")
     return None, None
 
+def get_library_id_for_directory(directory: str) -> tuple[str | None, str | None]:
+    """Get the library section ID shared by every file below a directory, if there is a single one."""
+    normalized_directory = os.path.normpath(directory)
+    directory_with_sep = os.path.join(normalized_directory, '')
+    for location, _, _ in _section_index:
+        if location != directory_with_sep and location.startswith(directory_with_sep):
+            return None, None  # another library is nested below this directory
+    return get_library_id_for_path(normalized_directory)
+
+def get_library_ids_for_directories(directories: List[str]) -> set[str]:
+    """Get the IDs of all library sections with a location inside or above one of the directories."""
+    library_ids = set()
+    for directory in directories:
+        directory_with_sep = os.path.join(os.path.normpath(directory), '')
+        for location, section_id, _ in _section_index:
+            if location.startswith(directory_with_sep) or directory_with_sep.startswith(location):
+                library_ids.add(section_id)
+    return library_ids
+
+@lru_cache(maxsize=4096)
+def normalize_folder(folder: str) -> str:
+    """Normalize a folder path, remembering recent results since many files share a folder."""
+    return os.path.normpath(folder)
+
+def parse_part_files(source) -> tuple[dict[str, set[str]], int, int | None]:
+    """Stream a Plex media container and collect Part files grouped by folder, the number of items and the container's totalSize, if given."""
+    files = {}
+    item_count = 0
+    total_size = None
+    root = None
+    for event, elem in ET.iterparse(source, events=('start', 'end')):
+        if event == 'start':
+            if elem.tag == 'MediaContainer':
+                root = elem
+                if elem.get('totalSize') is not None:
+                    total_size = int(elem.get('totalSize'))
+        elif elem.tag == 'Part':
+            file = elem.get('file')
+            if file:
+                folder, name = os.path.split(file)
+                files.setdefault(normalize_folder(folder), set()).add(name)
+        elif elem.tag == 'Video':
+            item_count += 1
+            # Drop the finished item from the container as well, otherwise the root keeps every
+            # emptied Video and the tree still grows with the number of items
+            if root is not None:
+                root.clear()
+    return files, item_count, total_size
+
+def merge_part_files(files: dict[str, set[str]], page: dict[str, set[str]]) -> int:
+    """Merge the part files of one page into the files collected so far and return how many were new."""
+    added = 0
+    for folder, names in page.items():
+        known = files.setdefault(folder, set())
+        known_count = len(known)
+        known.update(names)
+        added += len(known) - known_count
+    return added
+
+@lru_cache(maxsize=1)
+def get_plex_base_url() -> str:
+    """Get the Plex server URL without a trailing slash."""
+    return str(settings.plex.server).rstrip('/')
+
+def fetch_part_files(library_id: str, item_type: int, start: int) -> tuple[dict[str, set[str]], int, int | None]:
+    """Fetch one page of items of a library section and return its part files, item count and the section's total size."""
+    url = f"{get_plex_base_url()}/library/sections/{library_id}/all"
+    params = {
+        'X-Plex-Token': settings.plex.token,
+        'type': item_type,
+        'X-Plex-Container-Start': start,
+        'X-Plex-Container-Size': PLEX_PAGE_SIZE,
+        # Only the part files are needed, leave out the extra metadata Plex would otherwise attach
+        'includeGuids': 0,
+        'includeExternalMedia': 0,
+    }
+    # Parse straight off the socket instead of buffering the whole page first. The slot is
+    # held until the page is parsed, since the connection stays busy while it streams.
+    with _page_slots, _http.get(url, params=params, timeout=60, stream=True) as response:
+        response.raise_for_status()
+        response.raw.decode_content = True
+        return parse_part_files(response.raw)
+
+def get_library_cache_path() -> str:
+    """Get the path of the persisted library cache, next to the configuration."""
+    config_dir = "/app/config"
+    return os.path.join(config_dir, LIBRARY_CACHE_FILENAME) if os.path.isdir(config_dir) else LIBRARY_CACHE_FILENAME
+
+def load_library_cache():
+    """Load the library files persisted by a previous run, if any."""
+    global _library_cache
+    cache_path = get_library_cache_path()
+    try:
+        with open(cache_path, 'rb') as f:
+            _library_cache = pickle.load(f)
+        logger.info(f"💾 Loaded library cache from {BOLD}{cache_path}{RESET}")
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.warning(f"Could not load library cache from '{cache_path}': {e}")
+
+def save_library_cache():
+    """Persist the library files for the next run if any library was rebuilt."""
+    global _library_cache_dirty
+    if not _library_cache_dirty:
+        return
+    cache_path = get_library_cache_path()
+    try:
+        # Write to a temporary file first so an interrupted write never leaves a truncated cache
+        with open(f"{cache_path}.tmp", 'wb') as f:
+            pickle.dump(_library_cache, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(f"{cache_path}.tmp", cache_path)
+        _library_cache_dirty = False
+    except OSError as e:
+        logger.warning(f"Could not save library cache to '{cache_path}': {e}")
+
+def get_section_version(section) -> tuple:
+    """Get the timestamps that change whenever the contents of a library section change."""
+    # plexapi doesn't expose contentChangedAt, so it is read from the section's raw XML
+    return section.updatedAt, section._data.attrib.get('contentChangedAt')
+
 def cache_library_files(library_id: str):
     """Cache all files in a library section."""
+    global _library_cache_dirty
     if library_id in library_files:
-        logger.debug(f"Using cached files for library {BOLD}{library_id}{RESET}...")
+        logger.debug("Using cached files for library %s%s%s...", BOLD, library_id, RESET)
         return  # Already cached
     
     try:
         section = plex.library.sectionByID(int(library_id))
+
+        # Reuse the files from the previous run while Plex reports the section unchanged
+        version = get_section_version(section)
+        persisted = _library_cache.get(library_id)
+        if persisted and persisted['version'] == version:
+            library_files[library_id] = persisted['files']
+            logger.info(f"💾 Library {BOLD}{section.title}{RESET} unchanged since last run, using persisted cache")
+            return
+
         logger.info(f"💾 Initializing cache for library {BOLD}{section.title}{RESET}...")
         cache_start = time.time()
         
-        if section.type == 'show':
-            # For TV shows, get all episodes
-            for show in section.all():
-                for episode in show.episodes():
-                    for media in episode.media:
-                        for part in media.parts:
-                            if part.file:
-                                library_files[library_id].add(part.file)
+        # Fetch episodes (type 4) or movies (type 1) straight from the XML instead of lazily
+        # loading each item through plexapi. The first page tells how many more pages there
+        # are, and those are fetched in parallel.
+        item_type = 4 if section.type == 'show' else 1
+        files, item_count, total_size = fetch_part_files(library_id, item_type, 0)
+        if total_size is None:
+            # Without a totalSize the page count is unknown, so keep paging while pages come back
+            # full. A larger page means Plex ignored the paging and already sent everything, and
+            # a page without new files means it keeps repeating itself.
+            logger.debug("No totalSize for library %s, fetching pages sequentially", library_id)
+            start = 0
+            while item_count == PLEX_PAGE_SIZE:
+                start += PLEX_PAGE_SIZE
+                page, item_count, _ = fetch_part_files(library_id, item_type, start)
+                if not merge_part_files(files, page):
+                    break
         else:
-            # For movies, get all items
-            for item in section.all():
-                for media in item.media:
-                    for part in media.parts:
-                        if part.file:
-                            library_files[library_id].add(part.file)
+            with ThreadPoolExecutor(max_workers=PLEX_PAGE_WORKERS) as pool:
+                pages = pool.map(
+                    lambda start: fetch_part_files(library_id, item_type, start)[0],
+                    range(PLEX_PAGE_SIZE, total_size, PLEX_PAGE_SIZE)
+                )
+                for page in pages:
+                    merge_part_files(files, page)
+        library_files[library_id] = files
+        _library_cache[library_id] = {'version': version, 'files': files}
+        _library_cache_dirty = True
         
         cache_time = time.time() - cache_start
-        logger.info(f"💾 Cache initialized for library {BOLD}{section.title}{RESET}: {BOLD}{len(library_files[library_id])}{RESET} files in {BOLD}{cache_time:.2f}{RESET} seconds")
+        file_count = sum(len(names) for names in library_files[library_id].values())
+        logger.info(f"💾 Cache initialized for library {BOLD}{section.title}{RESET}: {BOLD}{file_count}{RESET} files in {BOLD}{cache_time:.2f}{RESET} seconds")
     except Exception as e:
         logger.error(f"Error caching library {library_id}: {str(e)}")
         # Clear the cache for this library if there was an error
         if library_id in library_files:
             del library_files[library_id]
 
-def is_in_plex(file_path: str) -> bool:
-    """Check if a file exists in Plex by searching in the appropriate library section."""
-    # Get the library ID for this path
-    library_id, library_title = get_library_id_for_path(file_path)
-    if not library_id:
-        return False
-
+def is_in_plex(file_path: str, library_id: str, resolve_symlink: bool = False) -> bool:
+    """Check if a file exists in Plex by searching in the given library section."""
     # Cache library files if not already cached
     cache_library_files(library_id)
     
-    # Check if file exists in cached paths using exact matching
-    is_found = file_path in library_files[library_id]
+    # Check if file exists in cached (normalized) paths using exact matching,
+    # optionally also accepting a symlink whose target Plex knows about
+    files = library_files[library_id]
+    folder, name = os.path.split(file_path)
+    is_found = name in files.get(folder, ())
+    if not is_found and resolve_symlink:
+        folder, name = os.path.split(os.path.realpath(file_path))
+        is_found = name in files.get(folder, ())
     if is_found:
-        logger.debug(f"Found in cache: {BOLD}{file_path}{RESET}")
+        logger.debug("Found in cache: %s%s%s", BOLD, file_path, RESET)
     return is_found
 
-def scan_folder(library_id: str, folder_path: str):
+async def scan_folder(session: aiohttp.ClientSession, semaphore: asyncio.BoundedSemaphore, library_id: str, folder_path: str):
     """Trigger a library scan for a specific folder."""
-    encoded_path = quote(folder_path)
-    url = f"{str(settings.plex.server).rstrip('/')}/library/sections/{library_id}/refresh?path={encoded_path}&X-Plex-Token={settings.plex.token}"
-    logger.debug(f"Scan URL: {url}")
+    url = f"{get_plex_base_url()}/library/sections/{library_id}/refresh"
+    params = {'path': folder_path, 'X-Plex-Token': settings.plex.token}
+    logger.debug("Scan URL: %s?path=%s", url, folder_path)
     
+    async with semaphore:
+        try:
+            async with session.get(url, params=params, timeout=aiohttp.ClientTimeout(total=30)) as response:
+                response.raise_for_status()
+            logger.info(f"🔎 Scan triggered for: {BOLD}{folder_path}{RESET}")
+            # Hold the slot for scan_interval, so Plex receives at most
+            # PLEX_REFRESH_CONCURRENCY refreshes per interval
+            await asyncio.sleep(settings.behaviour.scan_interval)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.error(f"Failed to trigger scan for '{folder_path}': {e}")
+
+async def refresh_all(pending_refreshes: dict[str, set[str]]):
+    """Trigger all queued folder scans concurrently, paced by scan_interval."""
+    refreshes = [
+        (library_id, folder_path)
+        for library_id, folders in pending_refreshes.items()
+        for folder_path in sorted(folders)
+    ]
+    if not refreshes:
+        return
+
+    scan_interval = settings.behaviour.scan_interval
+    logger.info(f"⏳ Triggering {BOLD}{len(refreshes)}{RESET} scans, up to {PLEX_REFRESH_CONCURRENCY} every {BOLD}{scan_interval}{RESET} seconds.")
+    session = await get_session()
+    semaphore = asyncio.BoundedSemaphore(PLEX_REFRESH_CONCURRENCY)
+    await asyncio.gather(*[
+        scan_folder(session, semaphore, library_id, folder_path)
+        for library_id, folder_path in refreshes
+    ])
+
+def is_covered_by(folder: str, folders: set[str]) -> bool:
+    """Check if a folder or any of its parent folders is in the given set."""
+    while folders:
+        if folder in folders:
+            return True
+        parent = os.path.dirname(folder)
+        if parent == folder:
+            break
+        folder = parent
+    return False
+
+def get_symlink_target_mode(entry: os.DirEntry) -> int | None:
+    """Get the st_mode of a symlink's target, or None if the symlink is broken."""
     try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        logger.info(f"🔎 Scan triggered for: {BOLD}{folder_path}{RESET}")
-        scan_interval = settings.behaviour.scan_interval
-        logger.info(f"⏳ Waiting {BOLD}{scan_interval}{RESET} seconds before next scan.")
-        time.sleep(scan_interval)
-    except requests.RequestException as e:
-        logger.error(f"Failed to trigger scan for '{folder_path}': {e}")
-
-def is_broken_symlink(file_path: str) -> bool:
-    """Check if a file is a broken symlink."""
-    if not os.path.islink(file_path):
-        return False
-    return not os.path.exists(os.path.realpath(file_path))
-
-def run_scan():
+        return os.stat(entry.path).st_mode
+    except OSError:
+        return None
+
+async def check_symlinks(entries: list[os.DirEntry], batch: int = 512) -> tuple[set[str], set[str]]:
+    """Return the paths of entries that are broken symlinks and of those pointing to a directory, checking them concurrently."""
+    loop = asyncio.get_running_loop()
+    broken, directories = set(), set()
+    # Only symlinks need resolving; is_symlink() is answered from the cached dirent
+    symlinks = [entry for entry in entries if entry.is_symlink()]
+    with ThreadPoolExecutor(max_workers=32) as pool:
+        for start in range(0, len(symlinks), batch):
+            chunk = symlinks[start:start + batch]
+            modes = await asyncio.gather(
+                *[loop.run_in_executor(pool, get_symlink_target_mode, entry) for entry in chunk]
+            )
+            for entry, mode in zip(chunk, modes):
+                if mode is None:
+                    broken.add(entry.path)
+                elif stat.S_ISDIR(mode):
+                    directories.add(entry.path)
+    return broken, directories
+
+def iter_media_folders(root: str):
+    """Yield (folder, DirEntry list) for every folder below root holding media files, skipping hidden entries."""
+    # Normalizing the root once keeps every yielded path normalized as well.
+    # Folders come out parent before child since a folder is listed before its subfolders are visited.
+    stack = [os.path.normpath(root)]
+    # Bind the names used per entry locally to keep global and attribute lookups out of the loop
+    scandir, push, media_extensions = os.scandir, stack.append, MEDIA_EXT_NAMES
+    while stack:
+        directory = stack.pop()
+        media = []
+        try:
+            with scandir(directory) as entries:
+                for entry in entries:
+                    name = entry.name
+                    if name.startswith('.'):
+                        continue  # skip hidden/system files and folders
+                    if entry.is_dir(follow_symlinks=False):
+                        push(entry.path)
+                        continue
+                    _, dot, extension = name.rpartition('.')
+                    if dot and extension.lower() in media_extensions:
+                        # Symlinks are not resolved here, check_symlinks() does that off the event loop
+                        media.append(entry)
+        except OSError as e:
+            logger.warning(f"Could not read directory '{directory}': {e}")
+        if media:
+            yield directory, media
+
+async def run_scan():
     """Main scan logic."""
     stats = RunStats()
     
@@ -435,10 +686,21 @@ def run_scan():
         error_msg = "Could not find both Movie and TV Show libraries."
         logger.error(error_msg)
         stats.add_error(error_msg)
-        asyncio.run(stats.send_discord_summary())
+        await stats.send_discord_summary(await get_session())
         return
 
-    scanned_folders = set()
+    # Warm the caches of all libraries under the scan directories in the background,
+    # so the Plex requests overlap with the directory walk
+    loop = asyncio.get_running_loop()
+    prefetch = asyncio.gather(*[
+        loop.run_in_executor(None, cache_library_files, library_id)
+        for library_id in get_library_ids_for_directories(settings.scan.directories)
+    ])
+
+    symlink_check = settings.behaviour.symlink_check
+
+    # Parent folders to refresh, keyed by library section ID
+    pending_refreshes: dict[str, set[str]] = defaultdict(set)
 
     for scan_path in settings.scan.directories:
         logger.info(f"\nScanning directory: {BOLD}{scan_path}{RESET}")
@@ -449,44 +711,80 @@ def run_scan():
             stats.add_error(error_msg)
             continue
 
-        for root, _, files in os.walk(scan_path):
-            for file in files:
-                if file.startswith('.'):
-                    continue  # skip hidden/system files
-
-                if os.path.splitext(file)[1].lower() not in MEDIA_EXTENSIONS:
-                    continue  # skip non-media files
-
-                file_path = os.path.join(root, file)
-                
-                # Check for broken symlinks if enabled
-                if settings.behaviour.symlink_check and is_broken_symlink(file_path):
-                    warning_msg = f"⏩ Skipping broken symlink: {file_path}"
-                    logger.warning(warning_msg)
-                    stats.increment_broken_symlinks()
-                    continue
-
-                stats.increment_scanned()
-
-                if not is_in_plex(file_path):
-                    library_id, library_title = get_library_id_for_path(file_path)
-                    if library_title:
-                        stats.add_missing_item(library_title, file_path)
-                        logger.info(f"📁 Found missing item: {BOLD}{file_path}{RESET}")
-                    
-                        # Determine library type and scan parent folder
-                        parent_folder = os.path.dirname(file_path)
-                        if parent_folder not in scanned_folders:
-                            if library_id:
-                                scan_folder(library_id, parent_folder)
-                                scanned_folders.add(parent_folder)
-                            else:
-                                warning_msg = f"Could not determine library for path: {file_path}"
-                                logger.warning(warning_msg)
-                                stats.add_warning(warning_msg)
+        folders = dict(iter_media_folders(scan_path))
+
+        # Resolve the symlinks among the media files: broken ones are skipped if enabled,
+        # and ones pointing to a directory are no media files at all
+        broken_symlinks, directory_symlinks = await check_symlinks(
+            [entry for entries in folders.values() for entry in entries]
+        )
+        if not symlink_check:
+            broken_symlinks = set()
+
+        # Library caches must be complete before files are checked against them
+        await prefetch
+
+        # Resolve the library once for the whole directory, unless other libraries live below it
+        scan_library = get_library_id_for_directory(scan_path)
+        # Files compared against a library cache, to tell a synced directory from a skipped one
+        scanned_before, missing_before, checked = stats.total_scanned, stats.total_missing, 0
+
+        for folder, folder_entries in folders.items():
+            if broken_symlinks:
+                for entry in folder_entries:
+                    if entry.path in broken_symlinks:
+                        warning_msg = f"⏩ Skipping broken symlink: {entry.path}"
+                        logger.warning(warning_msg)
+                        stats.increment_broken_symlinks()
+            if broken_symlinks or directory_symlinks:
+                folder_entries = [
+                    entry for entry in folder_entries
+                    if entry.path not in broken_symlinks and entry.path not in directory_symlinks
+                ]
+
+            stats.increment_scanned(len(folder_entries))
+
+            library_id, library_title = scan_library if scan_library[0] else get_library_id_for_path(folder)
+            if not library_id:
+                continue
+
+            # A refresh of a folder rescans everything below it, so subfolders of an
+            # already queued folder need no checks of their own
+            if is_covered_by(folder, pending_refreshes[library_id]):
+                continue
+
+            # One set difference per folder instead of a lookup per file
+            cache_library_files(library_id)
+            known_names = library_files[library_id].get(folder, set())
+            missing_names = {entry.name for entry in folder_entries} - known_names
+            checked += len(folder_entries)
+            if not missing_names:
+                continue
+
+            missing = [
+                entry.path for entry in folder_entries
+                if entry.name in missing_names
+                and not (symlink_check and entry.is_symlink() and is_in_plex(entry.path, library_id, resolve_symlink=True))
+            ]
+            for file_path in missing:
+                stats.add_missing_item(library_title, file_path)
+                logger.info(f"📁 Found missing item: {BOLD}{file_path}{RESET}")
+
+            if missing:
+                # Queue the folder for a refresh once the walk is done
+                pending_refreshes[library_id].add(folder)
+
+        if checked and stats.total_missing == missing_before and checked == stats.total_scanned - scanned_before:
+            logger.info(f"✅ All {stats.total_scanned - scanned_before} media files are known to Plex")
+
+    # Also when no scan directory could be read, so no cache thread is still writing while it is saved
+    await prefetch
+    save_library_cache()
+
+    await refresh_all(pending_refreshes)
 
     # Send the final summary to Discord
-    asyncio.run(stats.send_discord_summary())
+    await stats.send_discord_summary(await get_session())
 
 # --- Application Entrypoint ---
 
@@ -543,6 +841,15 @@ def load_and_validate_settings() -> Settings | None:
     
     return None
 
+async def async_main():
+    """Run the scanner every run_interval hours inside a single event loop that owns the HTTP session."""
+    try:
+        while True:
+            await run_scan()
+            await asyncio.sleep(settings.behaviour.run_interval * 3600)
+    finally:
+        await close_session()
+
 def main():
     """Main function to initialize and run the scanner on a schedule."""
     global settings, plex
@@ -567,14 +874,10 @@ def main():
         exit(1)
 
     logger.info(f"🕒 Scan will run every {settings.behaviour.run_interval} hours.")
+
+    load_library_cache()
     
-    run_scan()
-    
-    schedule.every(settings.behaviour.run_interval).hours.do(run_scan)
-    
-    while True:
-        schedule.run_pending()
-        time.sleep(60)
+    asyncio.run(async_main())
 
 if __name__ == '__main__':
     main()